@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+"""
+Read-only HTTP API serving the dashboard aggregates as JSON.
+
+The whole agg_daily_events rollup is held in memory and only reloaded when
+Snowflake reports the table changed, so consumers never query the warehouse.
+Rendered responses are kept in an LRU cache per data version, carry an
+ETag (If-None-Match gets a 304) and are gzipped when the client accepts it;
+the gzip and identity bodies have distinct ETags.
+
+Endpoints: GET /aggregates/<type|hour|day|location|date>?since=YYYY-MM-DD&until=YYYY-MM-DD&limit=N
+           GET /health
+
+Usage: python aggregates_api.py
+       python aggregates_api.py --port 8082 --refresh 300
+       python aggregates_api.py --rollup-csv rollup.csv
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+from datetime import date, datetime
+from functools import lru_cache, partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+ROLLUP_TABLE = "crime_db.staging_mart.agg_daily_events"
+
+# URL dimension -> rollup column
+DIMENSIONS = {
+    "type": "TYPE",
+    "hour": "EVENT_HOUR",
+    "day": "DAY_OF_WEEK",
+    "location": "LOCATION_NAME",
+    "date": "EVENT_DATE",
+}
+
+# Dimensions ranked by count; the rest are returned in key order
+RANKED_DIMENSIONS = {"type", "location"}
+
+class RollupStore:
+    """In-memory copy of the rollup, reloaded only when its version changes"""
+
+    def __init__(
+        self,
+        fetch_version: Callable[[], str],
+        fetch_rollup: Callable[[], pd.DataFrame],
+        cache_size: int = 1024,
+    ):
+        self.fetch_version = fetch_version
+        self.fetch_rollup = fetch_rollup
+        self.cache_size = cache_size
+        # (version, rollup, render) published together so a request never mixes
+        # one version's ETag with another version's data
+        self.snapshot: Optional[Tuple[str, pd.DataFrame, Callable]] = None
+
+    @property
+    def version(self) -> Optional[str]:
+        snapshot = self.snapshot
+        return snapshot[0] if snapshot else None
+
+    def refresh(self) -> bool:
+        """Reload the rollup if the warehouse has a newer version, returns True if reloaded"""
+        version = self.fetch_version()
+        if version == self.version:
+            return False
+        rollup = self.fetch_rollup()
+        rollup.columns = [col.upper() for col in rollup.columns]
+        rollup["EVENT_DATE"] = pd.to_datetime(rollup["EVENT_DATE"]).dt.date
+        for col in ("TYPE", "LOCATION_NAME"):
+            rollup[col] = rollup[col].astype("category")
+        # A fresh LRU cache per snapshot; the old one goes away with the old rollup
+        render = lru_cache(maxsize=self.cache_size)(partial(self._render, version, rollup))
+        self.snapshot = (version, rollup, render)
+        print(f"Loaded rollup version {version} ({len(rollup)} rows)")
+        return True
+
+    @staticmethod
+    def aggregate(rollup: pd.DataFrame, dimension: str, since: Optional[date], until: Optional[date],
+                  limit: Optional[int]) -> list:
+        """Event counts grouped by one dimension within an optional date range"""
+        mask = pd.Series(True, index=rollup.index)
+        if since is not None:
+            mask &= rollup["EVENT_DATE"] >= since
+        if until is not None:
+            mask &= rollup["EVENT_DATE"] <= until
+
+        column = DIMENSIONS[dimension]
+        counts = rollup.loc[mask].groupby(column, observed=True)["EVENT_COUNT"].sum()
+        if dimension in RANKED_DIMENSIONS:
+            counts = counts.sort_values(ascending=False)
+        else:
+            counts = counts.sort_index()
+        if limit is not None:
+            counts = counts.head(limit)
+
+        return [
+            {"key": key.isoformat() if isinstance(key, date) else key, "event_count": int(count)}
+            for key, count in counts.items()
+        ]
+
+    def _render(self, version: str, rollup: pd.DataFrame, dimension: str, since: Optional[date],
+                until: Optional[date], limit: Optional[int]) -> Tuple[bytes, str, bytes, str]:
+        """Serialize one response from a single version's rollup, as identity and gzip variants"""
+        body = json.dumps({
+            "dimension": dimension,
+            "since": since.isoformat() if since else None,
+            "until": until.isoformat() if until else None,
+            "data_version": version,
+            "results": self.aggregate(rollup, dimension, since, until, limit),
+        }, ensure_ascii=False, default=str).encode("utf-8")
+        digest = hashlib.sha1(f"{version}|{dimension}|{since}|{until}|{limit}".encode("utf-8")).hexdigest()
+        # Strong ETags must differ per byte representation
+        return body, f'"{digest}"', gzip.compress(body), f'"{digest}-gzip"'
+
+def parse_date(value: Optional[str]) -> Optional[date]:
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check: a comma-separated list or "*", compared weakly per RFC 9110"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+def make_handler(store: RollupStore):
+    class AggregatesHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; don't let Nagle delay the body
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/health":
+                status = 200 if store.version is not None else 503
+                self._send_json(status, {"status": "ok" if status == 200 else "loading",
+                                         "data_version": store.version})
+                return
+
+            parts = url.path.strip("/").split("/")
+            if len(parts) != 2 or parts[0] != "aggregates" or parts[1] not in DIMENSIONS:
+                self._send_json(404, {"error": f"Unknown endpoint, use /aggregates/<{'|'.join(DIMENSIONS)}>"})
+                return
+            snapshot = store.snapshot
+            if snapshot is None:
+                self._send_json(503, {"error": "Rollup not loaded yet"})
+                return
+
+            params = parse_qs(url.query)
+            try:
+                since = parse_date(params.get("since", [None])[0])
+                until = parse_date(params.get("until", [None])[0])
+                limit = int(params["limit"][0]) if "limit" in params else None
+                if limit is not None and limit < 1:
+                    raise ValueError("limit must be at least 1")
+            except ValueError as e:
+                self._send_json(400, {"error": f"Invalid parameter: {e}"})
+                return
+
+            _, _, render = snapshot
+            body, etag, gzipped, gzip_etag = render(parts[1], since, until, limit)
+            use_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+            if use_gzip:
+                payload, etag = gzipped, gzip_etag
+            else:
+                payload = body
+
+            if etag_matches(self.headers.get("If-None-Match"), etag):
+                self.send_response(304)
+                self._send_cache_headers(etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self._send_cache_headers(etag)
+            if use_gzip:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _send_cache_headers(self, etag: str):
+            # Same validators on 200 and 304 so caches keep the variants apart
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+
+        def _send_json(self, status: int, data: Dict):
+            payload = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            # Per-request logging would dominate at high QPS
+            pass
+
+    return AggregatesHandler
+
+def snowflake_sources():
+    """Version and rollup fetchers backed by Snowflake"""
+    import snowflake.connector
+    from load_police_api import SNOWFLAKE_CONFIG
+
+    def query(sql):
+        conn = snowflake.connector.connect(**SNOWFLAKE_CONFIG)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            df = pd.DataFrame(cursor.fetchall(), columns=[col[0] for col in cursor.description])
+            cursor.close()
+            return df
+        finally:
+            conn.close()
+
+    def fetch_version():
+        # Metadata only, no warehouse scan
+        df = query("""
+            SELECT last_altered, row_count
+            FROM crime_db.INFORMATION_SCHEMA.TABLES
+            WHERE table_schema = 'STAGING_MART' AND table_name = 'AGG_DAILY_EVENTS'
+        """)
+        return f"{df['LAST_ALTERED'][0].isoformat()}-{df['ROW_COUNT'][0]}" if len(df) else "empty"
+
+    def fetch_rollup():
+        return query(f"SELECT event_date, type, location_name, event_hour, day_of_week, event_count FROM {ROLLUP_TABLE}")
+
+    return fetch_version, fetch_rollup
+
+def csv_sources(path: str):
+    """Version and rollup fetchers backed by a CSV export of the rollup"""
+    import os
+
+    def fetch_version():
+        stat = os.stat(path)
+        return f"{int(stat.st_mtime)}-{stat.st_size}"
+
+    return fetch_version, lambda: pd.read_csv(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve dashboard aggregates as a cached JSON API")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8082, help="Port to listen on (default: 8082)")
+    parser.add_argument("--refresh", type=float, default=300,
+                        help="Seconds between data version checks (default: 300)")
+    parser.add_argument("--cache-size", type=int, default=1024, help="Responses kept in the LRU cache (default: 1024)")
+    parser.add_argument("--rollup-csv", help="Serve a CSV export of agg_daily_events instead of Snowflake")
+    args = parser.parse_args()
+
+    if args.rollup_csv:
+        fetch_version, fetch_rollup = csv_sources(args.rollup_csv)
+    else:
+        from dotenv import load_dotenv
+        load_dotenv()
+        fetch_version, fetch_rollup = snowflake_sources()
+
+    store = RollupStore(fetch_version, fetch_rollup, cache_size=args.cache_size)
+    store.refresh()
+
+    stop = threading.Event()
+
+    def refresh_loop():
+        while not stop.wait(args.refresh):
+            try:
+                store.refresh()
+            except Exception as e:
+                # Keep serving the last good rollup
+                print(f"Refresh failed: {e}")
+
+    threading.Thread(target=refresh_loop, daemon=True).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store))
+    print(f"Serving aggregates on http://{args.host}:{args.port}/aggregates/type")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
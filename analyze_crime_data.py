@@ -1,9 +1,12 @@
+import argparse
+import time
 import snowflake.connector
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from anomaly_detection import score_anomalies
 
 # Load environment variables
 load_dotenv()
@@ -19,25 +22,80 @@ snowflake_config = {
     "role": "ACCOUNTADMIN"
 }
 
-def get_data(query):
-    """Execute query and return results as DataFrame"""
+# Command-line options
+parser = argparse.ArgumentParser(description="Analyze Swedish police events in Snowflake")
+parser.add_argument("--since", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                    help="Only include events on or after this date (YYYY-MM-DD)")
+parser.add_argument("--until", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                    help="Only include events on or before this date (YYYY-MM-DD)")
+parser.add_argument("--anomaly-window", type=int, default=7,
+                    help="Days in the latest window scored for anomalies (default: 7)")
+parser.add_argument("--anomaly-top", type=int, default=20,
+                    help="Number of anomaly alerts to show (default: 20)")
+parser.add_argument("--no-result-cache", action="store_true",
+                    help="Disable Snowflake's result cache so bytes scanned reflect a real scan")
+args = parser.parse_args()
+
+if args.no_result_cache:
+    snowflake_config["session_parameters"] = {"USE_CACHED_RESULT": False}
+
+def date_filter(since, until):
+    """Build a predicate on event_date so Snowflake can prune micro-partitions"""
+    conditions = []
+    if since is not None:
+        conditions.append(f"event_date >= '{since.isoformat()}'")
+    if until is not None:
+        conditions.append(f"event_date <= '{until.isoformat()}'")
+    return " AND ".join(conditions) if conditions else "1 = 1"
+
+def get_bytes_scanned(cursor, query_id):
+    """Look up bytes scanned for a query in the current session"""
+    cursor.execute(
+        "SELECT bytes_scanned FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY_BY_SESSION()) "
+        "WHERE query_id = %s",
+        (query_id,)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def get_data(query, arrow=False):
+    """Execute query and return results as DataFrame
+
+    With arrow the result is fetched as Arrow batches (fetch_pandas_all), which
+    avoids building Python tuples for large results such as the rollup.
+    """
     try:
         conn = snowflake.connector.connect(**snowflake_config)
-        df = pd.read_sql(query, conn)
+        cursor = conn.cursor()
+        cursor.execute(query)
+        if arrow:
+            df = cursor.fetch_pandas_all()
+        else:
+            df = pd.DataFrame(cursor.fetchall(), columns=[col[0] for col in cursor.description])
+        bytes_scanned = get_bytes_scanned(cursor, cursor.sfqid)
+        if bytes_scanned is not None:
+            print(f"(bytes scanned: {bytes_scanned:,})")
+        cursor.close()
         conn.close()
         return df
     except Exception as e:
         print(f"Error: {e}")
         return None
 
+where_dates = date_filter(args.since, args.until)
+if args.since or args.until:
+    print(f"Date range: {args.since or 'start'} to {args.until or 'latest'}")
+    print()
+
 # Analysis 1: Event count by type
 print("[ANALYSIS 1] Events by Type")
 print("=" * 50)
-query1 = """
+query1 = f"""
 SELECT 
     type,
     COUNT(*) as event_count
 FROM crime_db.staging_mart.fct_police_events
+WHERE {where_dates}
 GROUP BY type
 ORDER BY event_count DESC
 LIMIT 10
@@ -50,12 +108,12 @@ if df1 is not None:
 # Analysis 2: Events by hour of day
 print("[ANALYSIS 2] Events by Hour of Day")
 print("=" * 50)
-query2 = """
+query2 = f"""
 SELECT 
     event_hour,
     COUNT(*) as event_count
 FROM crime_db.staging_mart.fct_police_events
-WHERE event_hour IS NOT NULL
+WHERE event_hour IS NOT NULL AND {where_dates}
 GROUP BY event_hour
 ORDER BY event_hour
 """
@@ -68,12 +126,12 @@ if df2 is not None:
 print("[ANALYSIS 3] Events by Day of Week")
 print("=" * 50)
 day_names = {1: 'Sunday', 2: 'Monday', 3: 'Tuesday', 4: 'Wednesday', 5: 'Thursday', 6: 'Friday', 7: 'Saturday'}
-query3 = """
+query3 = f"""
 SELECT 
     day_of_week,
     COUNT(*) as event_count
 FROM crime_db.staging_mart.fct_police_events
-WHERE day_of_week IS NOT NULL
+WHERE day_of_week IS NOT NULL AND {where_dates}
 GROUP BY day_of_week
 ORDER BY day_of_week
 """
@@ -87,12 +145,12 @@ if df3 is not None and len(df3) > 0:
 # Analysis 4: Top 10 locations
 print("[ANALYSIS 4] Top 10 Locations")
 print("=" * 50)
-query4 = """
+query4 = f"""
 SELECT 
     location,
     COUNT(*) as event_count
 FROM crime_db.staging_mart.fct_police_events
-WHERE location IS NOT NULL AND location != ''
+WHERE location IS NOT NULL AND location != '' AND {where_dates}
 GROUP BY location
 ORDER BY event_count DESC
 LIMIT 10
@@ -105,18 +163,46 @@ if df4 is not None:
 # Analysis 5: Events with GPS coordinates
 print("[ANALYSIS 5] GPS Coverage Statistics")
 print("=" * 50)
-query5 = """
+query5 = f"""
 SELECT 
     COUNT(*) as total_events,
     SUM(CASE WHEN latitude IS NOT NULL AND longitude IS NOT NULL THEN 1 ELSE 0 END) as events_with_coordinates,
-    ROUND(100.0 * SUM(CASE WHEN latitude IS NOT NULL AND longitude IS NOT NULL THEN 1 ELSE 0 END) / COUNT(*), 2) as coverage_percent
+    ROUND(100.0 * SUM(CASE WHEN latitude IS NOT NULL AND longitude IS NOT NULL THEN 1 ELSE 0 END) / NULLIF(COUNT(*), 0), 2) as coverage_percent
 FROM crime_db.staging_mart.fct_police_events
+WHERE {where_dates}
 """
 df5 = get_data(query5)
 if df5 is not None:
     print(df5.to_string(index=False))
     print()
 
+# Analysis 6: Anomalies in the latest window
+print(f"[ANALYSIS 6] Anomalies in the Last {args.anomaly_window} Days")
+print("=" * 50)
+query6 = f"""
+SELECT 
+    event_date,
+    type,
+    location_name,
+    event_hour,
+    event_count
+FROM crime_db.staging_mart.agg_daily_events
+WHERE {where_dates}
+"""
+fetch_start = time.perf_counter()
+df6 = get_data(query6, arrow=True)
+fetch_seconds = time.perf_counter() - fetch_start
+if df6 is not None:
+    score_start = time.perf_counter()
+    df_alerts = score_anomalies(df6, window_days=args.anomaly_window, top=args.anomaly_top)
+    print(f"({len(df6):,} rollup rows: fetched in {fetch_seconds:.2f}s, "
+          f"scored in {time.perf_counter() - score_start:.2f}s)")
+    if len(df_alerts) > 0:
+        print(df_alerts.to_string(index=False))
+    else:
+        print("No unusual spikes found")
+    print()
+
 # Create visualizations
 print("\n[OUTPUT] Creating visualizations...")
 
@@ -170,7 +256,7 @@ print("[SUCCESS] Visualization saved as 'crime_analysis.png'")
 print("\n" + "=" * 50)
 print("[SUMMARY STATISTICS]") 
 print("=" * 50)
-query_summary = "SELECT COUNT(*) as total_events, COUNT(DISTINCT type) as unique_types FROM crime_db.staging_mart.fct_police_events"
+query_summary = f"SELECT COUNT(*) as total_events, COUNT(DISTINCT type) as unique_types FROM crime_db.staging_mart.fct_police_events WHERE {where_dates}"
 df_summary = get_data(query_summary)
 if df_summary is not None:
     print(f"Total Events: {df_summary['TOTAL_EVENTS'][0]:,}")
@@ -0,0 +1,86 @@
+"""
+Spike detection on per-location, per-type event rates.
+
+Works on the agg_daily_events rollup. For every (location, type, hour-of-week)
+slot the baseline weekly rate comes from the history before the latest window.
+The window's observed count is then scored against it with a Poisson z-score.
+Everything is computed with NumPy on integer-encoded slot keys, so there are
+no Python loops over groups.
+"""
+
+import numpy as np
+import pandas as pd
+
+HOURS_PER_WEEK = 168
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+def score_anomalies(
+    rollup: pd.DataFrame,
+    window_days: int = 7,
+    prior_weeks: float = 1.0,
+    min_expected: float = 0.5,
+    min_count: int = 3,
+    threshold: float = 3.0,
+    top: int = 20,
+) -> pd.DataFrame:
+    """Rank (location, type, hour-of-week) slots by how far the latest window exceeds baseline
+
+    rollup needs EVENT_DATE, TYPE, LOCATION_NAME, EVENT_HOUR and EVENT_COUNT
+    columns. Sparse slots are smoothed towards the location/type's average
+    per-slot weekly rate with prior_weeks pseudo-weeks of weight. Slots with fewer than
+    min_count events in the window or a z-score below threshold are dropped.
+    """
+    columns = ["LOCATION_NAME", "TYPE", "DAY_NAME", "EVENT_HOUR", "OBSERVED", "EXPECTED", "RATIO", "Z_SCORE"]
+    if rollup is None or len(rollup) == 0:
+        return pd.DataFrame(columns=columns)
+
+    dates = pd.to_datetime(rollup["EVENT_DATE"]).to_numpy(dtype="datetime64[D]")
+    counts = rollup["EVENT_COUNT"].to_numpy(dtype=np.float64)
+    hours = rollup["EVENT_HOUR"].to_numpy(dtype=np.int64)
+    location_codes, locations = pd.factorize(rollup["LOCATION_NAME"], use_na_sentinel=False)
+    type_codes, types = pd.factorize(rollup["TYPE"], use_na_sentinel=False)
+
+    # Monday = 0; day 0 of datetime64 (1970-01-01) was a Thursday
+    weekday = (dates.astype(np.int64) + 3) % 7
+    hour_of_week = weekday * 24 + hours
+
+    window_start = dates.max() - np.timedelta64(window_days - 1, "D")
+    in_window = dates >= window_start
+    baseline_days = (window_start - dates.min()).astype(np.int64)
+    if baseline_days <= 0:
+        return pd.DataFrame(columns=columns)
+    baseline_weeks = baseline_days / 7
+    window_weeks = window_days / 7
+
+    # One integer key per (location, type) pair, then per hour-of-week slot
+    pair_key = location_codes.astype(np.int64) * len(types) + type_codes
+    slot_key = pair_key * HOURS_PER_WEEK + hour_of_week
+
+    slots, slot_index = np.unique(slot_key, return_inverse=True)
+    baseline = np.bincount(slot_index, weights=np.where(in_window, 0.0, counts), minlength=len(slots))
+    observed = np.bincount(slot_index, weights=np.where(in_window, counts, 0.0), minlength=len(slots))
+
+    # Average weekly rate per hour slot for the location/type, used as the prior
+    slot_pairs = slots // HOURS_PER_WEEK
+    pairs, pair_index = np.unique(slot_pairs, return_inverse=True)
+    pair_baseline = np.bincount(pair_index, weights=baseline, minlength=len(pairs))
+    prior_rate = pair_baseline[pair_index] / HOURS_PER_WEEK / baseline_weeks
+
+    expected = np.maximum(window_weeks * (baseline + prior_weeks * prior_rate) / (baseline_weeks + prior_weeks), min_expected)
+    z_score = (observed - expected) / np.sqrt(expected)
+
+    flagged = np.flatnonzero((observed >= min_count) & (z_score >= threshold))
+    flagged = flagged[np.argsort(-z_score[flagged], kind="stable")][:top]
+
+    slot_hour = slots[flagged] % HOURS_PER_WEEK
+    flagged_pairs = slot_pairs[flagged]
+    return pd.DataFrame({
+        "LOCATION_NAME": np.asarray(locations)[flagged_pairs // len(types)],
+        "TYPE": np.asarray(types)[flagged_pairs % len(types)],
+        "DAY_NAME": np.asarray(DAY_NAMES)[slot_hour // 24],
+        "EVENT_HOUR": slot_hour % 24,
+        "OBSERVED": observed[flagged].astype(np.int64),
+        "EXPECTED": expected[flagged].round(2),
+        "RATIO": (observed[flagged] / expected[flagged]).round(1),
+        "Z_SCORE": z_score[flagged].round(2),
+    }, columns=columns)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Benchmark anomaly scoring on a synthetic multi-year rollup.
+
+Generates agg_daily_events-shaped rows for many locations and types, then times
+score_anomalies() on them. The result fetch usually costs more than scoring, so the
+benchmark also times client-side decoding of the rollup: Arrow batches, as
+fetch_pandas_all() receives them, versus a DataFrame built from fetchall() tuples.
+With --snowflake it fetches the real rollup and times the whole fetch end to end.
+
+Usage: python benchmark_anomalies.py
+       python benchmark_anomalies.py --locations 5000 --types 60 --years 5 --rows 20000000
+       python benchmark_anomalies.py --snowflake
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detection import score_anomalies
+
+def synthetic_rollup(locations: int, types: int, years: int, rows: int, seed: int = 0) -> pd.DataFrame:
+    """Random rollup rows with skewed location/type popularity and a few planted spikes"""
+    rng = np.random.default_rng(seed)
+    days = years * 365
+    start = np.datetime64("2026-01-01") - np.timedelta64(days, "D")
+
+    # Zipf-like popularity so a few big cities/types dominate, as in the real data
+    location_weights = 1 / np.arange(1, locations + 1)
+    type_weights = 1 / np.arange(1, types + 1)
+
+    rollup = pd.DataFrame({
+        "EVENT_DATE": start + rng.integers(0, days, rows).astype("timedelta64[D]"),
+        "TYPE": pd.Categorical.from_codes(
+            rng.choice(types, rows, p=type_weights / type_weights.sum()),
+            [f"Type {i}" for i in range(types)]),
+        "LOCATION_NAME": pd.Categorical.from_codes(
+            rng.choice(locations, rows, p=location_weights / location_weights.sum()),
+            [f"Location {i}" for i in range(locations)]),
+        "EVENT_HOUR": rng.integers(0, 24, rows).astype(np.int8),
+        "EVENT_COUNT": rng.poisson(1.5, rows).astype(np.int32) + 1,
+    })
+
+    # Plant spikes in the last day for the detector to find
+    spikes = pd.DataFrame({
+        "EVENT_DATE": np.full(10, start + np.timedelta64(days - 1, "D")),
+        "TYPE": pd.Categorical.from_codes(rng.integers(0, types, 10), rollup["TYPE"].cat.categories),
+        "LOCATION_NAME": pd.Categorical.from_codes(rng.integers(0, locations, 10), rollup["LOCATION_NAME"].cat.categories),
+        "EVENT_HOUR": rng.integers(0, 24, 10).astype(np.int8),
+        "EVENT_COUNT": np.full(10, 25, dtype=np.int32),
+    })
+    return pd.concat([rollup, spikes], ignore_index=True)
+
+def time_decode(rollup: pd.DataFrame):
+    """Seconds to decode the rollup from Arrow IPC and from Python tuples (no network)"""
+    import pyarrow as pa
+
+    # Snowflake sends text columns as plain strings, not dictionary-encoded
+    rollup = rollup.astype({col: str for col in rollup.select_dtypes("category").columns})
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(rollup, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    buffer = sink.getvalue()
+
+    start = time.perf_counter()
+    pa.ipc.open_stream(buffer).read_all().to_pandas()
+    arrow_seconds = time.perf_counter() - start
+
+    tuples = list(rollup.astype(object).itertuples(index=False, name=None))
+    start = time.perf_counter()
+    pd.DataFrame(tuples, columns=list(rollup.columns))
+    tuple_seconds = time.perf_counter() - start
+    return arrow_seconds, tuple_seconds
+
+def fetch_snowflake_rollup() -> pd.DataFrame:
+    """Fetch the real rollup the same way analyze_crime_data.py does"""
+    import snowflake.connector
+    from load_police_api import SNOWFLAKE_CONFIG
+
+    conn = snowflake.connector.connect(**SNOWFLAKE_CONFIG)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT event_date, type, location_name, event_hour, event_count
+            FROM crime_db.staging_mart.agg_daily_events
+        """)
+        rollup = cursor.fetch_pandas_all()
+        cursor.close()
+        return rollup
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized anomaly scoring")
+    parser.add_argument("--locations", type=int, default=3000, help="Number of locations (default: 3000)")
+    parser.add_argument("--types", type=int, default=50, help="Number of event types (default: 50)")
+    parser.add_argument("--years", type=int, default=3, help="Years of history (default: 3)")
+    parser.add_argument("--rows", type=int, default=5_000_000, help="Rollup rows (default: 5,000,000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs (default: 3)")
+    parser.add_argument("--snowflake", action="store_true",
+                        help="Fetch and score the real agg_daily_events rollup instead of synthetic data")
+    args = parser.parse_args()
+
+    if args.snowflake:
+        start = time.perf_counter()
+        rollup = fetch_snowflake_rollup()
+        print(f"Fetched {len(rollup):,} rollup rows from Snowflake in {time.perf_counter() - start:.2f}s "
+              f"(query + fetch_pandas_all)")
+    else:
+        print(f"Generating {args.rows:,} rollup rows: {args.locations:,} locations x {args.types} types "
+              f"over {args.years} years...")
+        rollup = synthetic_rollup(args.locations, args.types, args.years, args.rows)
+        arrow_seconds, tuple_seconds = time_decode(rollup)
+        print(f"Decoded in {arrow_seconds:.2f}s from Arrow, {tuple_seconds:.2f}s from tuples "
+              f"(client side only, excludes network and warehouse time)")
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        alerts = score_anomalies(rollup)
+        timings.append(time.perf_counter() - start)
+
+    print(f"Scored in {min(timings):.2f}s (best of {args.repeat}, worst {max(timings):.2f}s)")
+    print(f"Top alerts:")
+    print(alerts.head(10).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
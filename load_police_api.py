@@ -2,9 +2,10 @@ import requests
 import json
 import snowflake.connector
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Set, Tuple
 import os
 from dotenv import load_dotenv
+from search_index import create_search_index_table, index_events
 
 # Load environment variables
 load_dotenv()
@@ -55,96 +56,176 @@ def create_staging_table(conn):
     cursor.close()
     print("Staging table ready")
 
-def insert_events(conn, events: List[Dict]):
-    """Insert fetched events into staging table"""
+def staging_table_exists(conn) -> bool:
+    """Check for the staging table without creating it"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT COUNT(*)
+        FROM crime_db.INFORMATION_SCHEMA.TABLES
+        WHERE table_schema = 'PUBLIC' AND table_name = 'POLICE_EVENTS_STAGING'
+    """)
+    exists = cursor.fetchone()[0] > 0
+    cursor.close()
+    return exists
+
+def get_loaded_event_ids(conn, event_ids: List[str]) -> Set[str]:
+    """Return which of the given event IDs are already in the staging table"""
+    if not event_ids:
+        return set()
+    placeholders = ", ".join(["%s"] * len(event_ids))
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT event_id FROM crime_db.PUBLIC.police_events_staging WHERE event_id IN ({placeholders})",
+        tuple(event_ids)
+    )
+    loaded_ids = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return loaded_ids
+
+def filter_new_events(events: List[Dict], loaded_ids: Set[str]) -> List[Dict]:
+    """Drop events whose ID is already loaded"""
+    return [event for event in events if str(event.get("id", "")) not in loaded_ids]
+
+def event_to_row(event: Dict) -> Tuple:
+    """Flatten one API event into a staging table row"""
+    # Extract fields
+    event_id = str(event.get("id", ""))
+    name = str(event.get("name", ""))
+    description = str(event.get("summary", ""))  # API uses 'summary' not 'description'
+    event_type = str(event.get("type", ""))
+    
+    # Parse location - API returns location as dict with 'name' and 'gps'
+    location_data = event.get("location", {})
+    location_name = location_data.get("name", "") if isinstance(location_data, dict) else str(location_data)
+    location = json.dumps(location_data) if isinstance(location_data, dict) else str(location_data)
+    
+    # Parse GPS coordinates from "latitude,longitude" format
+    latitude = None
+    longitude = None
+    gps_string = location_data.get("gps", "") if isinstance(location_data, dict) else ""
+    
+    if gps_string:
+        try:
+            lat_str, lon_str = gps_string.strip().split(",")
+            latitude = float(lat_str.strip())
+            longitude = float(lon_str.strip())
+        except (ValueError, AttributeError) as e:
+            print(f"Warning: Could not parse GPS '{gps_string}' for event {event_id}: {e}")
+    
+    datetime_val = str(event.get("datetime", ""))
+    affected_area = location_name  # Use location name as affected area
+    api_response = json.dumps(event)
+    
+    return (
+        event_id, name, description, event_type, location,
+        latitude, longitude, datetime_val, affected_area, api_response
+    )
+
+def insert_events(conn, events: List[Dict], batch_size: int = 500, commit: bool = True) -> List[Dict]:
+    """Insert fetched events into staging table, returns the events actually inserted
+
+    Each batch is written with a single multi-row INSERT ... SELECT FROM VALUES,
+    so TRY_PARSE_JSON still runs on the raw response. A failing batch is skipped.
+    """
     if not events:
         print("No events to insert")
-        return
+        return []
     
-    cursor = conn.cursor()
-    rows_inserted = 0
+    # Build rows first so one malformed event doesn't sink its whole batch
+    rows = []
+    row_events = []
     rows_skipped = 0
-    
     for event in events:
         try:
-            # Extract fields
-            event_id = str(event.get("id", ""))
-            name = str(event.get("name", ""))
-            description = str(event.get("summary", ""))  # API uses 'summary' not 'description'
-            event_type = str(event.get("type", ""))
-            
-            # Parse location - API returns location as dict with 'name' and 'gps'
-            location_data = event.get("location", {})
-            location_name = location_data.get("name", "") if isinstance(location_data, dict) else str(location_data)
-            location = json.dumps(location_data) if isinstance(location_data, dict) else str(location_data)
-            
-            # Parse GPS coordinates from "latitude,longitude" format
-            latitude = None
-            longitude = None
-            gps_string = location_data.get("gps", "") if isinstance(location_data, dict) else ""
-            
-            if gps_string:
-                try:
-                    lat_str, lon_str = gps_string.strip().split(",")
-                    latitude = float(lat_str.strip())
-                    longitude = float(lon_str.strip())
-                except (ValueError, AttributeError) as e:
-                    print(f"Warning: Could not parse GPS '{gps_string}' for event {event_id}: {e}")
-            
-            datetime_val = str(event.get("datetime", ""))
-            affected_area = location_name  # Use location name as affected area
-            api_response = json.dumps(event)
-            
-            # Use parameterized query with TRY_PARSE_JSON
-            insert_sql = """
-            INSERT INTO crime_db.PUBLIC.police_events_staging 
-            (event_id, name, description, type, location, latitude, longitude, datetime, affected_area, api_response)
-            SELECT %s, %s, %s, %s, %s, %s, %s, %s, %s, TRY_PARSE_JSON(%s)
-            """
-            
-            cursor.execute(insert_sql, (
-                event_id, name, description, event_type, location,
-                latitude, longitude, datetime_val, affected_area, api_response
-            ))
-            rows_inserted += 1
-            
-            if rows_inserted % 50 == 0:
-                print(f"Inserted {rows_inserted} events so far...")
-            
+            rows.append(event_to_row(event))
+            row_events.append(event)
         except Exception as e:
             rows_skipped += 1
-            print(f"Error inserting event {event.get('id', 'unknown')}: {e}")
+            print(f"Error preparing event {event.get('id', 'unknown')}: {e}")
+    
+    cursor = conn.cursor()
+    inserted = []
     
-    conn.commit()
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(batch))
+        insert_sql = f"""
+        INSERT INTO crime_db.PUBLIC.police_events_staging 
+        (event_id, name, description, type, location, latitude, longitude, datetime, affected_area, api_response)
+        SELECT column1, column2, column3, column4, column5, column6, column7, column8, column9, TRY_PARSE_JSON(column10)
+        FROM VALUES {values}
+        """
+        try:
+            cursor.execute(insert_sql, tuple(value for row in batch for value in row))
+            inserted.extend(row_events[start:start + batch_size])
+        except Exception as e:
+            rows_skipped += len(batch)
+            print(f"Error inserting batch of {len(batch)} events: {e}")
+    
+    if commit:
+        conn.commit()
+    cursor.close()
+    print(f"Inserted {len(inserted)} events, skipped {rows_skipped} events")
+    return inserted
+
+def write_events(conn, events: List[Dict], batch_size: int = 500) -> List[Dict]:
+    """Insert events and index them in one transaction, returns the events inserted
+
+    If indexing fails nothing is committed, so the events are still new on the
+    next load and get retried instead of sitting in staging unindexed.
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
     cursor.close()
-    print(f"Inserted {rows_inserted} events, skipped {rows_skipped} events")
+    try:
+        inserted = insert_events(conn, events, batch_size=batch_size, commit=False)
+        index_events(conn, inserted, commit=False)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return inserted
 
-def main():
-    """Main ETL pipeline"""
+def main(dry_run: bool = False) -> Optional[int]:
+    """Main ETL pipeline, returns number of new events (None on failure)
+
+    With dry_run the new events are counted but not inserted.
+    """
     print("Starting police events data load...")
     
     # Fetch API data
     events = fetch_police_events()
     if not events:
         print("No data to load")
-        return
+        return 0
     
     # Connect to Snowflake
     try:
         conn = snowflake.connector.connect(**SNOWFLAKE_CONFIG)
         print("Connected to Snowflake")
         
-        # Create staging table
+        fetched_ids = [str(event.get("id", "")) for event in events]
+        
+        if dry_run:
+            # Read-only: no DDL, a missing staging table means every event is new
+            loaded_ids = get_loaded_event_ids(conn, fetched_ids) if staging_table_exists(conn) else set()
+            new_events = filter_new_events(events, loaded_ids)
+            print(f"{len(new_events)} of {len(events)} fetched events are new")
+            conn.close()
+            return len(new_events)
+        
+        # Create staging and search index tables
         create_staging_table(conn)
+        create_search_index_table(conn)
         
-        # Truncate staging table to avoid duplicates
-        cursor = conn.cursor()
-        cursor.execute("TRUNCATE TABLE crime_db.PUBLIC.police_events_staging")
-        cursor.close()
-        print("Cleared staging table")
+        # Skip events already in staging to avoid duplicates
+        new_events = filter_new_events(events, get_loaded_event_ids(conn, fetched_ids))
+        print(f"{len(new_events)} of {len(events)} fetched events are new")
         
         # Insert events
-        insert_events(conn, events)
+        # Insert events and make them searchable
+        inserted = write_events(conn, new_events)
+        rows_inserted = len(inserted)
         
         # Verify load and show statistics
         cursor = conn.cursor()
@@ -170,11 +251,13 @@ def main():
         
         conn.close()
         print("\nData load complete!")
+        return rows_inserted
         
     except snowflake.connector.errors.Error as e:
         print(f"Snowflake error: {e}")
     except Exception as e:
         print(f"Error: {e}")
+    return None
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Measure requests/sec against a running aggregates API.
+
+Each worker thread keeps one keep-alive connection and requests the given
+paths in turn for the test duration.
+
+Usage: python load_test_api.py
+       python load_test_api.py --url http://127.0.0.1:8082 --threads 16 --duration 20
+       python load_test_api.py --etag --gzip
+"""
+
+import argparse
+import http.client
+import threading
+import time
+from typing import Dict, List
+from urllib.parse import urlparse
+
+DEFAULT_PATHS = [
+    "/aggregates/type?limit=15",
+    "/aggregates/hour",
+    "/aggregates/day",
+    "/aggregates/location?limit=15",
+    "/aggregates/date",
+]
+
+def worker(host: str, port: int, paths: List[str], deadline: float, use_etag: bool, use_gzip: bool,
+           results: Dict[str, list]):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    etags: Dict[str, str] = {}
+    latencies = []
+    statuses: Dict[int, int] = {}
+    errors = 0
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        headers = {}
+        if use_gzip:
+            headers["Accept-Encoding"] = "gzip"
+        if use_etag and path in etags:
+            headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    conn.close()
+    results["latencies"].extend(latencies)
+    results["errors"].append(errors)
+    results["statuses"].append(statuses)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the aggregates API")
+    parser.add_argument("--url", default="http://127.0.0.1:8082", help="API base URL")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent clients (default: 8)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run (default: 10)")
+    parser.add_argument("--etag", action="store_true", help="Send If-None-Match to exercise 304 responses")
+    parser.add_argument("--gzip", action="store_true", help="Request gzip-encoded responses")
+    parser.add_argument("--path", action="append", dest="paths", help="Path to request (repeatable)")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    paths = args.paths or DEFAULT_PATHS
+    results = {"latencies": [], "errors": [], "statuses": []}
+    deadline = time.perf_counter() + args.duration
+
+    threads = [
+        threading.Thread(target=worker, args=(url.hostname, url.port or 80, paths, deadline,
+                                              args.etag, args.gzip, results))
+        for _ in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(results["latencies"])
+    statuses: Dict[int, int] = {}
+    for worker_statuses in results["statuses"]:
+        for status, count in worker_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    print(f"Requests:     {len(latencies):,} in {elapsed:.1f}s ({args.threads} threads)")
+    print(f"Throughput:   {len(latencies) / elapsed:,.0f} requests/sec")
+    if latencies:
+        print(f"Latency p50:  {latencies[len(latencies) // 2] * 1000:.2f} ms")
+        print(f"Latency p99:  {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    print(f"Status codes: {dict(sorted(statuses.items()))}")
+    print(f"Errors:       {sum(results['errors'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+{{
+    config(
+        materialized='table',
+        schema='mart',
+        cluster_by=['event_date']
+    )
+}}
+
+SELECT
+    event_date,
+    type,
+    COALESCE(TRY_PARSE_JSON(location):name::STRING, location) AS location_name,
+    event_hour,
+    day_of_week,
+    COUNT(*) AS event_count,
+    -- Latest raw load included in this build, used by run_pipeline.py to detect staleness
+    (SELECT MAX(loaded_at) FROM {{ ref('fct_police_events') }}) AS source_loaded_at
+FROM {{ ref('fct_police_events') }}
+WHERE event_date IS NOT NULL
+GROUP BY event_date, type, location_name, event_hour, day_of_week
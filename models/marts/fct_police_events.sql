@@ -1,7 +1,8 @@
 {{
     config(
         materialized='table',
-        schema='mart'
+        schema='mart',
+        cluster_by=['event_date']
     )
 }}
 
@@ -18,5 +19,6 @@ SELECT
     DATE(event_datetime) AS event_date,
     EXTRACT(HOUR FROM event_datetime) AS event_hour,
     EXTRACT(DAYOFWEEK FROM event_datetime) AS day_of_week,
+    loaded_at,
     dbt_loaded_at
 FROM {{ ref('stg_police_events') }}
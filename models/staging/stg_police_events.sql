@@ -8,7 +8,7 @@
 SELECT
     event_id,
     name,
-    name AS description,
+    description,
     type,
     location,
     latitude,
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+"""
+Long-running poller that keeps the staging table close to real time.
+
+Instead of a one-shot load per cron tick, the daemon keeps one HTTP session and
+one Snowflake connection open, polls the Polisen API on a jittered schedule and
+inserts only events it has not seen before, in micro-batches. A small HTTP
+server exposes /health and /metrics.
+
+Usage: python poll_police_api.py
+       python poll_police_api.py --interval 120 --jitter 0.2 --port 8081
+       python poll_police_api.py --api-url http://localhost:9000/api/events
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import signal
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+import requests
+import snowflake.connector
+
+from load_police_api import (
+    API_URL,
+    SNOWFLAKE_CONFIG,
+    create_staging_table,
+    filter_new_events,
+    get_loaded_event_ids,
+    write_events,
+)
+from search_index import create_search_index_table
+
+class PolicePoller:
+    """Poll the Polisen API and micro-batch new events into staging"""
+
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        api_url: str = API_URL,
+        interval: float = 300,
+        jitter: float = 0.1,
+        batch_size: int = 100,
+        session: Optional[requests.Session] = None,
+    ):
+        self.connect = connect
+        self.api_url = api_url
+        self.interval = interval
+        self.jitter = jitter
+        self.batch_size = batch_size
+        self.session = session or requests.Session()
+        self.conn = None
+        self.seen_ids: Set[str] = set()
+        self.stopping = asyncio.Event()
+        self.metrics: Dict[str, float] = {
+            "polls_total": 0,
+            "poll_errors_total": 0,
+            "events_fetched_total": 0,
+            "events_inserted_total": 0,
+            "last_poll_timestamp": 0,
+            "last_success_timestamp": 0,
+        }
+
+    def next_delay(self) -> float:
+        """Seconds until the next poll, spread by +/- jitter to avoid synchronized clients"""
+        spread = self.interval * self.jitter
+        return max(0.0, self.interval + random.uniform(-spread, spread))
+
+    def _fetch(self) -> List[Dict]:
+        response = self.session.get(self.api_url, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def _ensure_connection(self):
+        """Open the warehouse connection once and make sure the tables exist"""
+        if self.conn is None:
+            self.conn = self.connect()
+            create_staging_table(self.conn)
+            create_search_index_table(self.conn)
+        return self.conn
+
+    def _store(self, events: List[Dict]) -> int:
+        conn = self._ensure_connection()
+        # Only IDs not known from the previous poll need a staging lookup
+        fetched_ids = {str(event.get("id", "")) for event in events}
+        stored_ids = self.seen_ids & fetched_ids
+        unseen = filter_new_events(events, stored_ids)
+        stored_ids |= get_loaded_event_ids(conn, [str(event.get("id", "")) for event in unseen])
+        new_events = filter_new_events(unseen, stored_ids)
+        rows_inserted = 0
+        try:
+            for start in range(0, len(new_events), self.batch_size):
+                batch = new_events[start:start + self.batch_size]
+                # One multi-row insert plus its index rows, committed together
+                inserted = write_events(conn, batch, batch_size=self.batch_size)
+                rows_inserted += len(inserted)
+                # Only mark events seen once both writes committed
+                stored_ids.update(str(event.get("id", "")) for event in inserted)
+        finally:
+            # The API only returns its latest window, so the set is replaced rather
+            # than grown and stays bounded by one fetch
+            self.seen_ids = stored_ids
+        return rows_inserted
+
+    def _reset_connection(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+    async def poll_once(self) -> int:
+        """Fetch and store one round of events, returns rows inserted"""
+        self.metrics["polls_total"] += 1
+        self.metrics["last_poll_timestamp"] = time.time()
+        try:
+            events = await asyncio.to_thread(self._fetch)
+        except Exception as e:
+            # API trouble says nothing about the warehouse; keep the connection warm
+            self.metrics["poll_errors_total"] += 1
+            print(f"Fetch failed: {e}")
+            return 0
+        self.metrics["events_fetched_total"] += len(events)
+        try:
+            rows_inserted = await asyncio.to_thread(self._store, events)
+        except Exception as e:
+            self.metrics["poll_errors_total"] += 1
+            print(f"Store failed: {e}")
+            # Reconnect on the next poll in case the session went stale
+            self._reset_connection()
+            return 0
+        self.metrics["events_inserted_total"] += rows_inserted
+        self.metrics["last_success_timestamp"] = time.time()
+        print(f"Poll complete: {len(events)} fetched, {rows_inserted} new")
+        return rows_inserted
+
+    async def run(self):
+        """Poll until stop() is called"""
+        while not self.stopping.is_set():
+            await self.poll_once()
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=self.next_delay())
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        self.stopping.set()
+
+    def close(self):
+        self._reset_connection()
+        self.session.close()
+
+    def health(self) -> Dict:
+        """Healthy while the last successful poll is within three intervals"""
+        last_success = self.metrics["last_success_timestamp"]
+        healthy = last_success > 0 and time.time() - last_success < self.interval * 3
+        return {
+            "status": "ok" if healthy else "degraded",
+            "last_success_timestamp": last_success,
+            "seen_events": len(self.seen_ids),
+        }
+
+    def render_metrics(self) -> str:
+        """Metrics in Prometheus text format"""
+        lines = [f"police_poller_{name} {value}" for name, value in self.metrics.items()]
+        lines.append(f"police_poller_seen_events {len(self.seen_ids)}")
+        return "\n".join(lines) + "\n"
+
+    async def handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Minimal HTTP/1.0 handler for /health and /metrics"""
+        try:
+            request_line = await reader.readline()
+            # Drain headers
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            path = parts[1] if len(parts) > 1 else "/"
+
+            if path == "/health":
+                health = self.health()
+                status = "200 OK" if health["status"] == "ok" else "503 Service Unavailable"
+                body, content_type = json.dumps(health), "application/json"
+            elif path == "/metrics":
+                status, body, content_type = "200 OK", self.render_metrics(), "text/plain; version=0.0.4"
+            else:
+                status, body, content_type = "404 Not Found", "Not Found\n", "text/plain"
+
+            payload = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.0 {status}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+async def serve(poller: PolicePoller, host: str, port: int):
+    """Run the poller and health server until SIGINT/SIGTERM"""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, poller.stop)
+        except (NotImplementedError, AttributeError):
+            # Windows: fall back to KeyboardInterrupt
+            pass
+
+    server = await asyncio.start_server(poller.handle_http, host, port)
+    print(f"Health endpoint listening on http://{host}:{port}/health")
+    try:
+        await poller.run()
+    finally:
+        server.close()
+        await server.wait_closed()
+        poller.close()
+        print("Poller stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll the Polisen API into Snowflake staging")
+    parser.add_argument("--api-url", default=API_URL, help="Events endpoint to poll")
+    parser.add_argument("--interval", type=float, default=300, help="Seconds between polls (default: 300)")
+    parser.add_argument("--jitter", type=float, default=0.1,
+                        help="Random spread as a fraction of the interval (default: 0.1)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Events per insert batch (default: 100)")
+    parser.add_argument("--host", default="127.0.0.1", help="Health endpoint host")
+    parser.add_argument("--port", type=int, default=8081, help="Health endpoint port (default: 8081)")
+    args = parser.parse_args()
+
+    poller = PolicePoller(
+        connect=lambda: snowflake.connector.connect(**SNOWFLAKE_CONFIG),
+        api_url=args.api_url,
+        interval=args.interval,
+        jitter=args.jitter,
+        batch_size=args.batch_size,
+    )
+    try:
+        asyncio.run(serve(poller, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    sys.exit(main())
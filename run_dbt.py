@@ -10,14 +10,19 @@ Usage: python run_dbt.py test
 import os
 import subprocess
 import sys
+from typing import List
 from dotenv import load_dotenv
 
 # Load environment variables from .env
 load_dotenv()
 
+def run_dbt(args: List[str]) -> int:
+    """Run dbt with the given arguments and return its exit code"""
+    dbt_args = ["dbt"] + args
+    result = subprocess.run(dbt_args)
+    return result.returncode
+
 # Run dbt with all passed arguments
 if __name__ == "__main__":
     # Pass all command-line arguments to dbt
-    dbt_args = ["dbt"] + sys.argv[1:]
-    result = subprocess.run(dbt_args)
-    sys.exit(result.returncode)
+    sys.exit(run_dbt(sys.argv[1:]))
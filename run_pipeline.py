@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+Orchestrate the full pipeline: load police events, then dbt build only what changed.
+
+Whether a source needs building is decided from warehouse state, not from what
+this run inserted. The newest loaded_at in the raw table is compared with the
+newest load each built model contains. A failed earlier build, or rows written
+by the poller daemon, therefore still trigger a build. Only models and tests
+downstream of stale sources are built, using dbt's own thread pool so
+independent nodes run in parallel.
+
+Usage: python run_pipeline.py
+       python run_pipeline.py --threads 8
+       python run_pipeline.py --dry-run
+       python run_pipeline.py --force
+"""
+
+import argparse
+import sys
+from typing import Dict, List
+
+import snowflake.connector
+
+import load_police_api
+from load_police_api import SNOWFLAKE_CONFIG
+from run_dbt import run_dbt
+
+# dbt source -> its raw table and the built tables with the load watermark they contain
+SOURCES = {
+    "crime.police_events_staging": {
+        "raw": ("crime_db.PUBLIC.police_events_staging", "loaded_at"),
+        "built": [
+            ("crime_db.staging_staging.stg_police_events", "loaded_at"),
+            ("crime_db.staging_mart.fct_police_events", "loaded_at"),
+            ("crime_db.staging_mart.agg_daily_events", "source_loaded_at"),
+        ],
+    },
+}
+
+def max_watermark(conn, table: str, column: str):
+    """Latest watermark in a table, None if the table is empty or doesn't exist yet"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT MAX({column}) FROM {table}")
+        return cursor.fetchone()[0]
+    except snowflake.connector.errors.ProgrammingError:
+        return None
+    finally:
+        cursor.close()
+
+def find_stale_sources(conn) -> Dict[str, bool]:
+    """A source is stale when any model built from it is missing or older than its raw rows"""
+    stale = {}
+    for source, tables in SOURCES.items():
+        raw_loaded_at = max_watermark(conn, *tables["raw"])
+        if raw_loaded_at is None:
+            stale[source] = False
+            continue
+        stale[source] = any(
+            built_loaded_at is None or built_loaded_at < raw_loaded_at
+            for built_loaded_at in (max_watermark(conn, *table) for table in tables["built"])
+        )
+    return stale
+
+def build_selectors(stale: Dict[str, bool]) -> List[str]:
+    """Return dbt selectors for everything downstream of stale sources"""
+    return [f"source:{source}+" for source, is_stale in stale.items() if is_stale]
+
+def build_dbt_args(command: str, selectors: List[str], threads: int) -> List[str]:
+    """Assemble the dbt command line for the selected nodes"""
+    args = [command, "--select", " ".join(selectors)]
+    if command == "ls":
+        args += ["--resource-type", "model", "--resource-type", "test"]
+        return args
+    args += ["--threads", str(threads)]
+    return args
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load police events and build changed dbt models")
+    parser.add_argument("--threads", type=int, default=4,
+                        help="Number of dbt models/tests to run in parallel (default: 4)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Report new events and the dbt nodes that would be built, without executing")
+    parser.add_argument("--force", action="store_true",
+                        help="Build everything downstream of the sources even if no new data arrived")
+    args = parser.parse_args()
+
+    # Stage 1: load
+    print("[STAGE 1] Load")
+    print("=" * 50)
+    new_rows = load_police_api.main(dry_run=args.dry_run)
+    if new_rows is None:
+        print("Load failed, aborting pipeline")
+        return 1
+
+    # Stage 2: transform
+    print()
+    print("[STAGE 2] dbt build")
+    print("=" * 50)
+    if args.force:
+        selectors = [f"source:{source}+" for source in SOURCES]
+    else:
+        try:
+            conn = snowflake.connector.connect(**SNOWFLAKE_CONFIG)
+            try:
+                stale = find_stale_sources(conn)
+            finally:
+                conn.close()
+        except snowflake.connector.errors.Error as e:
+            print(f"Could not check source state: {e}")
+            return 1
+        if args.dry_run and new_rows:
+            # Nothing was inserted, but these events would make the source stale
+            stale = {source: True for source in SOURCES}
+        selectors = build_selectors(stale)
+
+    if not selectors:
+        print("All models are up to date with their sources, skipping dbt build")
+        return 0
+
+    print(f"Selected: {' '.join(selectors)} ({args.threads} threads)")
+
+    if args.dry_run:
+        print("Dry run - nodes that would be built:")
+        return run_dbt(build_dbt_args("ls", selectors, args.threads))
+
+    return run_dbt(build_dbt_args("build", selectors, args.threads))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+Inverted index for keyword search over police event names and summaries.
+
+Each event's text is tokenized (lowercased, Swedish stopwords removed, light
+stemming so "rånet"/"rån", "polisens"/"polis" and "Stockholms"/"Stockholm" match) and stored
+as (token, event_id, weight) rows. The loader indexes new events after every
+insert; search queries look up tokens by equality and rank with TF-IDF.
+Changing the stemmer changes the stored tokens, so run --rebuild afterwards.
+
+Usage: python search_index.py --rebuild
+       python search_index.py "Stockholm rån"
+"""
+
+import argparse
+import re
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Tuple
+
+INDEX_TABLE = "crime_db.PUBLIC.police_events_search_index"
+STAGING_TABLE = "crime_db.PUBLIC.police_events_staging"
+MART_TABLE = "crime_db.staging_mart.fct_police_events"
+
+# Name hits count more than summary hits when ranking
+FIELD_WEIGHTS = {"name": 2.0, "summary": 1.0}
+
+STOPWORDS = {
+    "alla", "att", "av", "blev", "blir", "de", "dem", "den", "denna", "deras",
+    "dess", "det", "detta", "dig", "din", "du", "där", "efter", "ej", "eller",
+    "en", "er", "ett", "från", "för", "ha", "hade", "han", "hans", "har", "hon",
+    "honom", "hur", "här", "i", "in", "inte", "jag", "kan", "man", "med", "men",
+    "mot", "många", "ni", "nu", "när", "och", "om", "på", "sig", "sin", "sina",
+    "skall", "ska", "som", "till", "under", "upp", "ut", "utan", "vad", "var",
+    "vara", "vi", "vid", "vilket", "än", "är", "över",
+}
+
+# Definite/plural endings, longest first; a stem must keep at least MIN_STEM_LENGTH characters
+SUFFIXES = (
+    "arna", "erna", "orna", "ande", "ende",
+    "are", "ast", "het",
+    "en", "et", "ar", "er", "or",
+    "a", "e",
+)
+MIN_STEM_LENGTH = 3
+
+# Letters a genitive -s may follow (Snowball Swedish's s-ending), so "polis" keeps its s
+S_ENDING = set("bcdfghjklmnoprtvy")
+
+# Umlaut plurals ("brand"/"bränder", "stad"/"städer") share a stem once folded
+UMLAUT_FOLD = str.maketrans("äö", "ao")
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def stem(token: str) -> str:
+    """Strip a genitive -s, then one Swedish definite/plural suffix, and fold ä/ö"""
+    if len(token) > MIN_STEM_LENGTH + 1 and token.endswith("s") and token[-2] in S_ENDING:
+        token = token[:-1]
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            token = token[:-len(suffix)]
+            break
+    return token.translate(UMLAUT_FOLD)
+
+def tokenize(text: str) -> List[str]:
+    """Split text into stemmed search tokens, skipping stopwords and numbers"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFC", text).lower()
+    return [
+        stem(token)
+        for token in TOKEN_PATTERN.findall(text)
+        if token not in STOPWORDS and not token.isdigit() and len(token) > 1
+    ]
+
+def build_index_rows(event_id: str, name: str, summary: str) -> List[Tuple[str, str, float]]:
+    """Return (token, event_id, weight) rows for one event"""
+    weights: Counter = Counter()
+    for field, text in (("name", name), ("summary", summary)):
+        for token in tokenize(text):
+            weights[token] += FIELD_WEIGHTS[field]
+    return [(token, event_id, weight) for token, weight in weights.items()]
+
+def create_search_index_table(conn):
+    """Create index table if it doesn't exist, clustered so token lookups prune"""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {INDEX_TABLE} (
+        token STRING,
+        event_id STRING,
+        weight FLOAT
+    ) CLUSTER BY (token)
+    """)
+    cursor.close()
+
+def index_events(conn, events: List[Dict], commit: bool = True) -> int:
+    """Add API events to the search index, returns index rows written"""
+    rows = []
+    for event in events:
+        rows.extend(build_index_rows(
+            str(event.get("id", "")),
+            str(event.get("name", "")),
+            str(event.get("summary", "")),
+        ))
+    if not rows:
+        return 0
+
+    cursor = conn.cursor()
+    cursor.executemany(
+        f"INSERT INTO {INDEX_TABLE} (token, event_id, weight) VALUES (%s, %s, %s)",
+        rows
+    )
+    if commit:
+        conn.commit()
+    cursor.close()
+    print(f"Indexed {len(events)} events ({len(rows)} index rows)")
+    return len(rows)
+
+def rebuild_index(conn, batch_size: int = 10000) -> int:
+    """Rebuild the whole index from the staging table"""
+    create_search_index_table(conn)
+    cursor = conn.cursor()
+    cursor.execute(f"TRUNCATE TABLE {INDEX_TABLE}")
+    cursor.execute(f"SELECT event_id, name, description FROM {STAGING_TABLE}")
+
+    total = 0
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        total += index_events(conn, [
+            {"id": event_id, "name": name or "", "summary": description or ""}
+            for event_id, name, description in batch
+        ])
+    cursor.close()
+    return total
+
+def build_search_query(text: str, date_filter: str = "1 = 1", limit: int = 50) -> str:
+    """SQL returning mart events matching every search term, best match first
+
+    Tokens only contain word characters so they are safe to inline.
+    """
+    tokens = sorted(set(tokenize(text)))
+    if not tokens:
+        return ""
+    token_list = ", ".join(f"'{token}'" for token in tokens)
+    return f"""
+WITH matches AS (
+    SELECT token, event_id, weight
+    FROM {INDEX_TABLE}
+    WHERE token IN ({token_list})
+),
+doc_freq AS (
+    SELECT token, COUNT(DISTINCT event_id) AS df
+    FROM matches
+    GROUP BY token
+),
+scores AS (
+    SELECT 
+        m.event_id,
+        SUM(m.weight * LN(1 + (SELECT COUNT(*) FROM {STAGING_TABLE}) / d.df)) AS score
+    FROM matches m
+    JOIN doc_freq d ON m.token = d.token
+    GROUP BY m.event_id
+    HAVING COUNT(DISTINCT m.token) = {len(tokens)}
+)
+SELECT 
+    f.event_id,
+    f.name,
+    f.description,
+    f.type,
+    f.location,
+    f.event_datetime,
+    ROUND(s.score, 3) as score
+FROM scores s
+JOIN {MART_TABLE} f ON f.event_id = s.event_id
+WHERE {date_filter}
+ORDER BY score DESC, f.event_datetime DESC
+LIMIT {int(limit)}
+"""
+
+def main():
+    import pandas as pd
+    import snowflake.connector
+    from load_police_api import SNOWFLAKE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Build or query the police event search index")
+    parser.add_argument("query", nargs="?", help="Search terms, e.g. \"Stockholm rån\"")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from the staging table")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum results to show (default: 20)")
+    args = parser.parse_args()
+
+    conn = snowflake.connector.connect(**SNOWFLAKE_CONFIG)
+    try:
+        if args.rebuild:
+            rows = rebuild_index(conn)
+            print(f"Search index rebuilt with {rows} rows")
+        if args.query:
+            sql = build_search_query(args.query, limit=args.limit)
+            if not sql:
+                print("No searchable terms in query")
+                return
+            cursor = conn.cursor()
+            start = time.perf_counter()
+            cursor.execute(sql)
+            df = pd.DataFrame(cursor.fetchall(), columns=[col[0] for col in cursor.description])
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            cursor.close()
+            print(df.to_string(index=False))
+            print(f"\n{len(df)} results in {elapsed_ms:.0f} ms (query + fetch)")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -62,6 +62,17 @@ CREATE TABLE IF NOT EXISTS crime_db.PUBLIC.police_events_staging (
     loaded_at TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
 );
 
+-- Inverted index for keyword search (maintained by load_police_api.py / search_index.py)
+CREATE TABLE IF NOT EXISTS crime_db.PUBLIC.police_events_search_index (
+    token STRING,
+    event_id STRING,
+    weight FLOAT
+) CLUSTER BY (token);
+
+-- Optional: speed up token lookups. Requires Enterprise Edition and fails on
+-- Standard, so uncomment only if your account supports it.
+-- ALTER TABLE crime_db.PUBLIC.police_events_search_index ADD SEARCH OPTIMIZATION ON EQUALITY(token);
+
 
 USE ROLE ORGADMIN;
 SHOW ACCOUNTS;
\ No newline at end of file
@@ -4,8 +4,11 @@ import snowflake.connector
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
+from decimal import Decimal
+import json
 import os
 from dotenv import load_dotenv
+from search_index import build_search_query
 
 # Load environment variables
 load_dotenv()
@@ -32,15 +35,71 @@ snowflake_config = {
 def get_connection():
     return snowflake.connector.connect(**snowflake_config)
 
+def extract_location_name(location):
+    """Location is stored as the API's JSON object, return its name"""
+    if isinstance(location, dict):
+        return location.get('name', 'Unknown')
+    elif isinstance(location, str):
+        try:
+            loc_dict = json.loads(location)
+            return loc_dict.get('name', 'Unknown')
+        except (ValueError, AttributeError):
+            return 'Unknown'
+    return 'Unknown'
+
+def compact_frame(df, keep=None):
+    """Shrink a query result before it is cached
+
+    Columns not listed in keep (when given) are dropped, location JSON is
+    reduced to the location name, low-cardinality text columns
+    become categoricals, integers are downcast (hour/day fit in int8) and floats
+    become float32. Before/after sizes are kept in df.attrs["memory_report"].
+    """
+    bytes_before = int(df.memory_usage(deep=True).sum())
+
+    if keep is not None:
+        df = df[[col for col in df.columns if col in keep]].copy()
+
+    if "LOCATION" in df.columns:
+        df["LOCATION"] = df["LOCATION"].map(extract_location_name)
+
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object and series.map(lambda x: isinstance(x, Decimal)).any():
+            # Snowflake NUMBER(p, s) columns arrive as Decimal objects
+            series = pd.to_numeric(series, errors="coerce")
+
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            df[col] = series.astype("float32")
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if series.nunique(dropna=True) <= len(series) // 2:
+                df[col] = series.astype("category")
+
+    df.attrs["memory_report"] = {
+        "rows": len(df),
+        "bytes_before": bytes_before,
+        "bytes_after": int(df.memory_usage(deep=True).sum()),
+    }
+    return df
+
 @st.cache_data(ttl=3600)
-def get_data(query):
+def load_data(query, keep=None):
+    conn = get_connection()
+    return compact_frame(pd.read_sql(query, conn), keep)
+
+# Memory used by each cached query this run, shown in the sidebar
+memory_reports = {}
+
+def get_data(query, label="Query", keep=None):
     try:
-        conn = get_connection()
-        df = pd.read_sql(query, conn)
-        return df
+        df = load_data(query, keep)
     except Exception as e:
         st.error(f"Database Error: {e}")
         return None
+    memory_reports[label] = df.attrs.get("memory_report", {})
+    return df
 
 
 # Title
@@ -135,22 +194,61 @@ hr {
 st.sidebar.header("📊 Dashboard Controls")
 st.sidebar.button("🔄 Refresh Data")
 
+# Global date range - every query filters on event_date so Snowflake
+# only reads the micro-partitions clustered within the selected range
+query_date_bounds = """
+SELECT 
+    MIN(event_date) as min_date,
+    MAX(event_date) as max_date
+FROM crime_db.staging_mart.fct_police_events
+"""
+
+df_date_bounds = get_data(query_date_bounds, "Date bounds")
+
+if df_date_bounds is not None and pd.notna(df_date_bounds["MIN_DATE"][0]):
+    min_date = pd.to_datetime(df_date_bounds["MIN_DATE"][0]).date()
+    max_date = pd.to_datetime(df_date_bounds["MAX_DATE"][0]).date()
+else:
+    min_date = max_date = datetime.now().date()
+
+selected_dates = st.sidebar.date_input(
+    "📅 Date range",
+    value=(min_date, max_date),
+    min_value=min_date,
+    max_value=max_date
+)
+
+# date_input returns a single date while the user is still picking the range end,
+# and an empty tuple (or None) when the field is cleared - fall back to all dates
+if isinstance(selected_dates, (tuple, list)):
+    if len(selected_dates) == 0:
+        selected_dates = (min_date, max_date)
+    start_date = selected_dates[0]
+    end_date = selected_dates[1] if len(selected_dates) > 1 else selected_dates[0]
+elif selected_dates is None:
+    start_date, end_date = min_date, max_date
+else:
+    start_date = end_date = selected_dates
+
+date_filter = f"event_date BETWEEN '{start_date.isoformat()}' AND '{end_date.isoformat()}'"
+
 
 # =======================
 # Summary Statistics
 # =======================
 st.header("📈 Summary Statistics")
 
-query_summary = """
+query_summary = f"""
 SELECT 
     COUNT(*) as total_events,
     COUNT(DISTINCT type) as unique_types,
     COUNT(DISTINCT location) as unique_locations,
-    COUNT(DISTINCT DATE(event_datetime)) as days_covered
+    COUNT(DISTINCT event_date) as days_covered
 FROM crime_db.staging_mart.fct_police_events
+WHERE {date_filter}
 """
 
-df_summary = get_data(query_summary)
+df_summary = get_data(query_summary, "Summary")
 
 if df_summary is not None:
     col1, col2, col3, col4 = st.columns(4)
@@ -165,17 +263,18 @@ if df_summary is not None:
 # =======================
 st.header("1️⃣ Top Event Types")
 
-query1 = """
+query1 = f"""
 SELECT 
     type,
     COUNT(*) as event_count
 FROM crime_db.staging_mart.fct_police_events
+WHERE {date_filter}
 GROUP BY type
 ORDER BY event_count DESC
 LIMIT 15
 """
 
-df1 = get_data(query1)
+df1 = get_data(query1, "Top event types")
 
 if df1 is not None:
     fig1 = px.bar(
@@ -196,17 +295,17 @@ if df1 is not None:
 # =======================
 st.header("2️⃣ Events by Hour of Day")
 
-query2 = """
+query2 = f"""
 SELECT 
     event_hour,
     COUNT(*) as event_count
 FROM crime_db.staging_mart.fct_police_events
-WHERE event_hour IS NOT NULL
+WHERE event_hour IS NOT NULL AND {date_filter}
 GROUP BY event_hour
 ORDER BY event_hour
 """
 
-df2 = get_data(query2)
+df2 = get_data(query2, "Events by hour")
 
 if df2 is not None:
     fig2 = px.line(
@@ -231,17 +330,17 @@ day_names = {
     6: "Friday", 7: "Saturday"
 }
 
-query3 = """
+query3 = f"""
 SELECT 
     day_of_week,
     COUNT(*) as event_count
 FROM crime_db.staging_mart.fct_police_events
-WHERE day_of_week IS NOT NULL
+WHERE day_of_week IS NOT NULL AND {date_filter}
 GROUP BY day_of_week
 ORDER BY day_of_week
 """
 
-df3 = get_data(query3)
+df3 = get_data(query3, "Events by day")
 
 if df3 is not None:
     df3["day_name"] = df3["DAY_OF_WEEK"].map(day_names)
@@ -264,41 +363,26 @@ if df3 is not None:
 # =======================
 st.header("4️⃣ Top Event Locations")
 
-query4 = """
+query4 = f"""
 SELECT 
     location,
     COUNT(*) as event_count
 FROM crime_db.staging_mart.fct_police_events
-WHERE location IS NOT NULL AND location != ''
+WHERE location IS NOT NULL AND location != '' AND {date_filter}
 GROUP BY location
 ORDER BY event_count DESC
 LIMIT 15
 """
 
-df4 = get_data(query4)
+df4 = get_data(query4, "Top locations")
 
 if df4 is not None:
-    import json
-    
-    def extract_location_name(location):
-        if isinstance(location, dict):
-            return location.get('name', 'Unknown')
-        elif isinstance(location, str):
-            try:
-                loc_dict = json.loads(location)
-                return loc_dict.get('name', 'Unknown')
-            except:
-                return 'Unknown'
-        return 'Unknown'
-    
-    df4["location_name"] = df4["LOCATION"].apply(extract_location_name)
-
     fig4 = px.bar(
         df4,
         x="EVENT_COUNT",
-        y="location_name",
+        y="LOCATION",
         orientation="h",
-        labels={"EVENT_COUNT": "Incidents", "location_name": "City"},
+        labels={"EVENT_COUNT": "Incidents", "LOCATION": "City"},
         color="EVENT_COUNT",
         color_continuous_scale="Purples"
     )
@@ -312,15 +396,16 @@ if df4 is not None:
 # =======================
 st.header("5️⃣ GPS Coverage Statistics")
 
-query5 = """
+query5 = f"""
 SELECT 
     COUNT(*) as total_events,
     SUM(CASE WHEN latitude IS NOT NULL AND longitude IS NOT NULL THEN 1 ELSE 0 END) as events_with_coordinates,
-    ROUND(100.0 * SUM(CASE WHEN latitude IS NOT NULL AND longitude IS NOT NULL THEN 1 ELSE 0 END) / COUNT(*), 2) as coverage_percent
+    ROUND(100.0 * SUM(CASE WHEN latitude IS NOT NULL AND longitude IS NOT NULL THEN 1 ELSE 0 END) / NULLIF(COUNT(*), 0), 2) as coverage_percent
 FROM crime_db.staging_mart.fct_police_events
+WHERE {date_filter}
 """
 
-df5 = get_data(query5)
+df5 = get_data(query5, "GPS coverage")
 
 if df5 is not None:
     col1, col2, col3 = st.columns(3)
@@ -334,7 +419,23 @@ if df5 is not None:
 # =======================
 st.header("📋 Raw Data Explorer")
 
-query_raw = """
+search_text = st.text_input("🔍 Search events", placeholder="e.g. Stockholm rån")
+
+if search_text:
+    query_search = build_search_query(search_text, date_filter)
+    if not query_search:
+        st.info("No searchable terms in query.")
+    else:
+        search_columns = ("TYPE", "LOCATION", "EVENT_DATETIME", "NAME", "DESCRIPTION", "SCORE")
+        df_search = get_data(query_search, "Search results", keep=search_columns)
+        if df_search is not None and len(df_search) > 0:
+            search_df = df_search[list(search_columns)]
+            search_df.columns = ["Type", "Location", "Date & Time", "Name", "Summary", "Score"]
+            st.dataframe(search_df, use_container_width=True, hide_index=True)
+        elif df_search is not None:
+            st.info("No events match your search.")
+
+query_raw = f"""
 SELECT 
     event_id,
     type,
@@ -344,37 +445,17 @@ SELECT
     CAST(latitude AS FLOAT) as latitude,
     CAST(longitude AS FLOAT) as longitude
 FROM crime_db.staging_mart.fct_police_events
-WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+WHERE latitude IS NOT NULL AND longitude IS NOT NULL AND {date_filter}
 LIMIT 100
 """
 
-df_raw = get_data(query_raw)
+df_raw = get_data(query_raw, "Raw data")
 
 if df_raw is not None:
-    # Decode Unicode escape sequences in JSON strings
-    import json
-    for col in df_raw.select_dtypes(include=['object']).columns:
-        if col == 'LOCATION':
-            # Handle JSON with escaped Unicode
-            df_raw[col] = df_raw[col].apply(lambda x: json.loads(x) if isinstance(x, str) and x.startswith('{') else x)
-    
-    # Extract location name handling both dict and string formats
-    def extract_location_name(location):
-        if isinstance(location, dict):
-            return location.get('name', 'Unknown')
-        elif isinstance(location, str):
-            try:
-                loc_dict = json.loads(location)
-                return loc_dict.get('name', 'Unknown')
-            except:
-                return 'Unknown'
-        return 'Unknown'
-    
-    df_raw["location_name"] = df_raw["LOCATION"].apply(extract_location_name)
     df_raw["day_name"] = df_raw["DAY_OF_WEEK"].map(day_names)
 
     display_df = df_raw[
-        ["EVENT_ID", "TYPE", "location_name", "EVENT_DATETIME", "day_name", "LATITUDE", "LONGITUDE"]
+        ["EVENT_ID", "TYPE", "LOCATION", "EVENT_DATETIME", "day_name", "LATITUDE", "LONGITUDE"]
     ]
 
     display_df.columns = ["Event ID", "Type", "Location", "Date & Time", "Day", "latitude", "longitude"]
@@ -424,6 +505,22 @@ if df_raw is not None:
             st.info("No coordinates available for map.")
 
 
+# =======================
+# Cache Memory Report
+# =======================
+with st.sidebar.expander("🧠 Cached data memory"):
+    if memory_reports:
+        report_df = pd.DataFrame.from_dict(memory_reports, orient="index")
+        report_df["saved_percent"] = (
+            100 * (1 - report_df["bytes_after"] / report_df["bytes_before"].where(report_df["bytes_before"] > 0))
+        ).round(1)
+        st.dataframe(report_df, use_container_width=True)
+        st.caption(f"Total cached: {report_df['bytes_after'].sum() / 1024:,.1f} KiB "
+                   f"(was {report_df['bytes_before'].sum() / 1024:,.1f} KiB)")
+    else:
+        st.caption("No cached queries yet.")
+
+
 # =======================
 # Footer
 # =======================
@@ -0,0 +1,232 @@
+"""
+Tests for the poller daemon against a stub Polisen API and a fake warehouse.
+
+The loader's SQL is Snowflake-specific (three-part names, %s parameters,
+TRY_PARSE_JSON, FROM VALUES), so a real local database such as sqlite can't
+stand in. FakeSnowflakeConnection instead understands just the statements the
+loader issues and keeps staging and index rows in memory, with BEGIN/COMMIT/
+ROLLBACK semantics.
+
+Run: python -m unittest test_poll_police_api
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from poll_police_api import PolicePoller, serve
+
+STAGING_COLUMNS = 10
+
+def make_event(event_id, name="Rån, Stockholm", summary="Ett rån i centrala Stockholm."):
+    return {
+        "id": event_id,
+        "name": name,
+        "summary": summary,
+        "type": "Rån",
+        "datetime": "2026-01-19 13:49:49 +01:00",
+        "location": {"name": "Stockholm", "gps": "59.329324,18.068581"},
+    }
+
+class StubPoliceAPI:
+    """Serves a mutable list of events the way https://polisen.se/api/events does"""
+
+    def __init__(self, events=None):
+        self.events = list(events or [])
+        self.requests = 0
+        self.fail = False
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.fail:
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                payload = json.dumps(stub.events).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/events"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        statement = " ".join(sql.split())
+        self.conn.statements.append(statement)
+        if statement == "BEGIN":
+            self.conn.in_transaction = True
+        elif statement.startswith("INSERT INTO crime_db.PUBLIC.police_events_staging"):
+            self.conn.pending_staging.extend(params[0::STAGING_COLUMNS])
+            self.conn.insert_statements += 1
+            self._autocommit()
+        elif statement.startswith("SELECT event_id FROM crime_db.PUBLIC.police_events_staging"):
+            self.rows = [(event_id,) for event_id in params if event_id in self.conn.staging]
+        elif statement.startswith(("CREATE TABLE", "SELECT COUNT(*)")):
+            self.rows = [(1,)]
+        else:
+            raise AssertionError(f"Unexpected SQL: {statement}")
+
+    def executemany(self, sql, rows):
+        if self.conn.fail_index:
+            raise RuntimeError("index write failed")
+        self.conn.pending_index.extend(rows)
+        self._autocommit()
+
+    def _autocommit(self):
+        if not self.conn.in_transaction:
+            self.conn.commit()
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+class FakeSnowflakeConnection:
+    """In-memory stand-in for the statements the loader sends to Snowflake"""
+
+    def __init__(self):
+        self.logins = 0
+        self.staging = []
+        self.index = []
+        self.pending_staging = []
+        self.pending_index = []
+        self.statements = []
+        self.insert_statements = 0
+        self.in_transaction = False
+        self.fail_index = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.staging.extend(self.pending_staging)
+        self.index.extend(self.pending_index)
+        self.rollback()
+
+    def rollback(self):
+        self.pending_staging = []
+        self.pending_index = []
+        self.in_transaction = False
+
+    def close(self):
+        pass
+
+    def indexed_ids(self):
+        return {event_id for _, event_id, _ in self.index}
+
+class PollerTest(unittest.TestCase):
+    def setUp(self):
+        self.api = StubPoliceAPI([make_event(i) for i in range(5)])
+        self.conn = FakeSnowflakeConnection()
+        self.poller = PolicePoller(self.connect, api_url=self.api.url, interval=0.05, batch_size=2)
+
+    def connect(self):
+        self.conn.logins += 1
+        return self.conn
+
+    def tearDown(self):
+        self.poller.close()
+        self.api.close()
+
+    def test_poll_once_micro_batches_and_dedupes(self):
+        self.assertEqual(asyncio.run(self.poller.poll_once()), 5)
+        self.assertEqual(sorted(self.conn.staging), ["0", "1", "2", "3", "4"])
+        # batch_size=2 -> three multi-row inserts, not one per event
+        self.assertEqual(self.conn.insert_statements, 3)
+        self.assertEqual(self.conn.indexed_ids(), {"0", "1", "2", "3", "4"})
+
+        self.api.events.append(make_event(99, name="Stöld, Malmö", summary="Cykelstöld."))
+        self.assertEqual(asyncio.run(self.poller.poll_once()), 1)
+        self.assertEqual(len(self.conn.staging), 6)
+        self.assertIn("99", self.conn.indexed_ids())
+
+    def test_failed_indexing_rolls_back_and_retries(self):
+        self.conn.fail_index = True
+        self.assertEqual(asyncio.run(self.poller.poll_once()), 0)
+        self.assertEqual(self.poller.metrics["poll_errors_total"], 1)
+        self.assertEqual(self.conn.staging, [])
+        self.assertEqual(self.poller.seen_ids, set())
+
+        self.conn.fail_index = False
+        self.assertEqual(asyncio.run(self.poller.poll_once()), 5)
+        self.assertEqual(self.conn.indexed_ids(), set(self.conn.staging))
+
+    def test_seen_ids_track_only_the_latest_window(self):
+        asyncio.run(self.poller.poll_once())
+        self.assertEqual(self.poller.seen_ids, {"0", "1", "2", "3", "4"})
+
+        # The API window moves on: old events drop out of the response
+        self.api.events = [make_event(i) for i in range(3, 8)]
+        self.assertEqual(asyncio.run(self.poller.poll_once()), 3)
+        self.assertEqual(self.poller.seen_ids, {"3", "4", "5", "6", "7"})
+        self.assertEqual(len(self.conn.staging), 8)
+
+    def test_api_outage_keeps_warehouse_connection(self):
+        asyncio.run(self.poller.poll_once())
+        self.api.fail = True
+        for _ in range(3):
+            self.assertEqual(asyncio.run(self.poller.poll_once()), 0)
+        self.assertEqual(self.poller.metrics["poll_errors_total"], 3)
+        self.assertIs(self.poller.conn, self.conn)
+        self.assertEqual(self.conn.logins, 1)
+
+    def test_health_and_metrics_endpoints(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        async def get(path):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {path} HTTP/1.0\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            head, _, body = response.decode("utf-8").partition("\r\n\r\n")
+            return head.split("\r\n")[0], body
+
+        async def scenario():
+            task = asyncio.create_task(serve(self.poller, "127.0.0.1", port))
+            while self.poller.metrics["last_success_timestamp"] == 0:
+                await asyncio.sleep(0.01)
+            health = await get("/health")
+            metrics = await get("/metrics")
+            missing = await get("/nope")
+            self.poller.stop()
+            await asyncio.wait_for(task, timeout=5)
+            return health, metrics, missing
+
+        health, metrics, missing = asyncio.run(scenario())
+        self.assertIn("200", health[0])
+        self.assertEqual(json.loads(health[1])["status"], "ok")
+        self.assertIn("200", metrics[0])
+        self.assertIn("police_poller_events_inserted_total 5", metrics[1])
+        self.assertIn("404", missing[0])
+        self.assertIsNone(self.poller.conn)
+
+if __name__ == "__main__":
+    unittest.main()
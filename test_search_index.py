@@ -0,0 +1,58 @@
+"""
+Tests for search index tokenization and stemming.
+
+Run: python -m unittest test_search_index
+"""
+
+import unittest
+
+from search_index import build_index_rows, build_search_query, stem, tokenize
+
+class StemTest(unittest.TestCase):
+    def assertSameStem(self, *forms):
+        self.assertEqual({stem(form) for form in forms}, {stem(forms[0])}, forms)
+
+    def test_genitive_then_definite_suffix(self):
+        self.assertSameStem("polis", "polisen", "polisens", "poliser", "poliserna")
+        self.assertSameStem("rån", "rånet", "rånets")
+        self.assertSameStem("stockholm", "stockholms")
+        self.assertSameStem("bil", "bilen", "bilens", "bilar", "bilarna")
+
+    def test_s_only_stripped_after_valid_s_ending(self):
+        self.assertEqual(stem("polis"), "polis")
+        self.assertEqual(stem("hus"), "hus")
+
+    def test_umlaut_plurals(self):
+        self.assertSameStem("brand", "branden", "bränder", "bränderna")
+        self.assertSameStem("stad", "städer")
+
+    def test_short_tokens_kept(self):
+        self.assertEqual(stem("rån"), "rån")
+        self.assertEqual(stem("ses"), "ses")
+
+class TokenizeTest(unittest.TestCase):
+    def test_stockholm_ran_matches_inflected_text(self):
+        query = tokenize("Stockholm rån")
+        self.assertEqual(query, ["stockholm", "rån"])
+        self.assertTrue(set(query) <= set(tokenize("Rånet i Stockholms city")))
+
+    def test_drops_stopwords_numbers_and_single_characters(self):
+        self.assertEqual(tokenize("Polisen och 3 personer i en bil"), ["polis", "person", "bil"])
+        self.assertEqual(tokenize(""), [])
+
+    def test_normalizes_unicode(self):
+        # "å" as "a" + combining ring, as some clients send it
+        self.assertEqual(tokenize("Rån"), tokenize("Rån"))
+
+    def test_index_rows_weight_name_above_summary(self):
+        rows = {token: weight for token, _, weight in build_index_rows("1", "Rån, Stockholm", "Ett rån i Stockholms city.")}
+        self.assertEqual(rows, {"rån": 3.0, "stockholm": 3.0, "city": 1.0})
+
+    def test_search_query_uses_stemmed_tokens(self):
+        sql = build_search_query("Polisens bränder")
+        self.assertIn("WHERE token IN ('brand', 'polis')", sql)
+        self.assertIn("HAVING COUNT(DISTINCT m.token) = 2", sql)
+        self.assertEqual(build_search_query("och i"), "")
+
+if __name__ == "__main__":
+    unittest.main()